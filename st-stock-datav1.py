@@ -3,6 +3,9 @@ import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patheffects as path_effects
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
+from io import BytesIO
 from datetime import datetime
 #import portfolio_optimization_1 as po1
 #import portfolio_optimization_2 as po2
@@ -29,7 +32,12 @@ st.markdown(custom_css, unsafe_allow_html=True)
 
 
 
+# Fixed layout shared by every comparison row, so the columns line up from tile to tile
+row_layout = {'left': 0.05, 'right': 0.97, 'top': 0.9, 'bottom': 0.1, 'wspace': 0.5}
+
 # Function to scrape summary stock data
+# Cached briefly so re-runs do not refetch unchanged tickers
+@st.cache_data(ttl=900)
 def scrape_stock_data(ticker):
     stock = yf.Ticker(ticker)
     info = stock.info
@@ -83,11 +91,17 @@ def fetch_stock_performance(tickers, start_date, end_date):
         st.error(f"Error fetching stock performance data: {e}")
         return pd.DataFrame()
 
+# Function to fetch annual financials
+# Cached for a day since they rarely change; failures raise and are not cached
+@st.cache_data(ttl=86400)
+def fetch_annual_financials(ticker):
+    stock = yf.Ticker(ticker)
+    return stock.financials
+
 # Function to get financials
 def get_financials(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        financials = stock.financials
+        financials = fetch_annual_financials(ticker)
         return financials
     except Exception as e:
         st.error(f"Error fetching financials for {ticker}: {e}")
@@ -99,6 +113,162 @@ def fetch_stock_performance(tickers, start_date, end_date):
     return data
     
 
+# Function to gather the inputs a comparison row is drawn from
+def build_row_snapshot(ticker, stock_data):
+    financials = get_financials(ticker)
+
+    return {
+        "Ticker": ticker,
+        "Market Cap": stock_data["Market Cap (B)"] * 1e9 if stock_data["Market Cap (B)"] else 0,
+        "Profit Margin": stock_data["Profit Margin"],
+        "ROA": stock_data["ROA"],
+        "ROE": stock_data["ROE"],
+        "Current Year Revenue": financials.loc["Total Revenue"][0],
+        "Previous Year Revenue": financials.loc["Total Revenue"][1],
+        "Current Price": stock_data["Current Price"],
+        "52W Low": stock_data["52W Low"],
+        "52W High": stock_data["52W High"]
+    }
+
+# Function to render a figure to PNG bytes
+# Trims the vertical whitespace like st.pyplot's tight bbox, but keeps the full width so every tile lines up
+def figure_to_png(fig):
+    tight_bbox = fig.get_tightbbox()
+    bbox = Bbox.from_extents(0, tight_bbox.y0 - 0.1, fig.get_figwidth(), tight_bbox.y1 + 0.1)
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches=bbox)
+    return buffer.getvalue()
+
+# Function to render the label row of the comparison figure
+@st.cache_data
+def render_header_row():
+    fig = Figure(figsize=(28, 4))
+    axs = fig.subplots(1, 5, gridspec_kw=row_layout)
+
+    labels = ["Ticker", "Market Cap", "Financial Metrics", "Revenue Comparison", "52-Week Range"]
+    for j in range(5):
+        axs[j].axis('off')
+        axs[j].text(0.5, 0.5, labels[j], ha='center', va='center', fontsize=25, fontweight='bold')
+
+    return figure_to_png(fig)
+
+# Function to render one ticker's row of the comparison figure
+# Cached on the row snapshot and the shared market cap scale, so only changed rows are redrawn
+@st.cache_data(max_entries=256)
+def render_ticker_row(snapshot, max_market_cap):
+    fig = Figure(figsize=(28, 4))
+    axs = fig.subplots(1, 5, gridspec_kw=row_layout)
+    ticker = snapshot["Ticker"]
+
+    # Extract Profit Margin, ROA, and ROE values and convert to percentage
+    profit_margin = snapshot["Profit Margin"] * 100
+    roa = snapshot["ROA"] * 100 if isinstance(snapshot["ROA"], (float, int)) and snapshot["ROA"] > 0 else 0
+    roe = snapshot["ROE"] * 100 if isinstance(snapshot["ROE"], (float, int)) and snapshot["ROE"] > 0 else 0
+
+    # Ticker Labels (First Column)
+    axs[0].axis('off')
+    axs[0].text(0.5, 0.5, ticker, ha='center', va='center', fontsize=30)
+
+    # Market Cap Visualization (Second Column)
+    ax1 = axs[1]
+    market_cap = snapshot["Market Cap"]
+    relative_size = market_cap / max_market_cap if max_market_cap > 0 else 0
+    circle = plt.Circle((0.5, 0.5), relative_size * 0.5, color='lightblue')
+    ax1.add_artist(circle)
+    ax1.set_aspect('equal', adjustable='box')
+    text = ax1.text(0.5, 0.5, f"{market_cap / 1e9:.2f}B", ha='center', va='center', fontsize=20)
+    text.set_path_effects([path_effects.Stroke(linewidth=2, foreground='black'), path_effects.Normal()])
+    ax1.set_xlim(0, 1)
+    ax1.set_ylim(0, 1)
+    ax1.axis('off')
+
+    # ROE ROA and PM
+    # Financial Metrics (Third Column)
+    ax2 = axs[2]
+    metrics = [profit_margin, roa, roe]
+    metric_names = ["Profit Margin", "ROA", "ROE"]
+    ax2.barh(metric_names, metrics, color=['#A3C5A8', '#B8D4B0', '#C8DFBB'])
+
+    for index, (label, value) in enumerate(zip(metric_names, metrics)):
+        # Adjusting the position dynamically
+        label_x_offset = max(-1, -0.1 * len(str(value)))
+        ax2.text(label_x_offset, index, label, va='center', ha='right', fontsize=16)
+
+        # Add value label
+        value_x_position = value + 1 if value >= 0 else value - 1
+        ax2.text(value_x_position, index, f"{value:.2f}%", va='center', ha='left' if value >= 0 else 'right', fontsize=16)
+
+    ax2.spines['top'].set_visible(False)
+    ax2.spines['right'].set_visible(False)
+    ax2.spines['bottom'].set_visible(False)
+    ax2.spines['left'].set_visible(False)
+    ax2.set_xticks([])
+    ax2.set_yticks([])
+
+    # Revenue Comparison (Fourth Column)
+    ax3 = axs[3]
+    current_year_revenue_billion = snapshot["Current Year Revenue"] / 1e9
+    previous_year_revenue_billion = snapshot["Previous Year Revenue"] / 1e9
+    growth = ((current_year_revenue_billion - previous_year_revenue_billion) / previous_year_revenue_billion) * 100
+
+    line_color = 'green' if growth > 0 else 'red'
+
+    bars = ax3.bar(["2022", "2023"], [previous_year_revenue_billion, current_year_revenue_billion], color=['blue', 'orange'])
+
+    # Adjust Y-axis limits to leave space above the bars
+    ax3.set_ylim(0, max(previous_year_revenue_billion, current_year_revenue_billion) * 1.2)
+
+    # Adding value labels inside of the bars at the top in white
+    for bar in bars:
+        yval = bar.get_height()
+        ax3.text(bar.get_x() + bar.get_width()/2, yval * .95, round(yval, 2), ha='center', va='top', fontsize=18, fontweight='bold', color='white')
+
+    # Adding year labels inside of the bars toward the bottom
+    for bar_idx, bar in enumerate(bars):
+        ax3.text(bar.get_x() + bar.get_width()/2, -0.08, ["2022", "2023"][bar_idx], ha='center', va='bottom', fontsize=18, fontweight='bold', color='white')
+
+    # Adding growth line with color based on direction
+    ax3.plot(["2022", "2023"], [previous_year_revenue_billion, current_year_revenue_billion], color=line_color, marker='o', linestyle='-', linewidth=2)
+    ax3.text(1, current_year_revenue_billion * 1.05, f"{round(growth, 2)}%", color=line_color, ha='center', va='bottom', fontsize=16)
+
+    # Remove axes lines
+    ax3.spines['top'].set_visible(False)
+    ax3.spines['right'].set_visible(False)
+    ax3.spines['bottom'].set_visible(False)
+    ax3.spines['left'].set_visible(False)
+
+    # Remove x and y ticks
+    ax3.set_xticks([])
+    ax3.set_yticks([])
+
+    # 52-Week Range (Fifth Column)
+    ax4 = axs[4]
+    current_price = snapshot["Current Price"]
+    week_low = snapshot["52W Low"]
+    week_high = snapshot["52W High"]
+
+    # Calculate padding for visual clarity
+    padding = (week_high - week_low) * 0.05
+    ax4.set_xlim(week_low - padding, week_high + padding)
+
+    # Draw a horizontal line for the 52-week range
+    ax4.axhline(y=0.5, xmin=0, xmax=1, color='black', linewidth=3)
+
+    # Plot the Current Price as a red dot
+    ax4.scatter(current_price, 0.5, color='red', s=200)
+
+    # Annotations and labels
+    ax4.annotate(f'${current_price:.2f}', xy=(current_price, 0.5), fontsize=16, color='red', ha='center', va='bottom', xytext=(0, 10), textcoords='offset points')
+    ax4.annotate(f'${week_low:.2f}', xy=(week_low, 0.5), fontsize=16, color='black', ha='left', va='top', xytext=(5, -20), textcoords='offset points')
+    ax4.annotate(f'${week_high:.2f}', xy=(week_high, 0.5), fontsize=16, color='black', ha='right', va='top', xytext=(-5, -20), textcoords='offset points')
+
+    # Remove axes
+    ax4.axis('off')
+
+    return figure_to_png(fig)
+
+
 
 # Streamlit app layout
 st.title('Portfolio Management - Stock Comparative Analysis')
@@ -148,6 +318,8 @@ if st.button('Run'):
 
     # Create an empty list to store dictionaries of stock data
     stock_data_list = []
+    # Keyed by ticker, since tickers that fail to fetch are skipped; rows still follow the order of tickers
+    stock_data_by_ticker = {}
 
 
     # Loop through each ticker, scrape the data, and add it to the list
@@ -155,6 +327,7 @@ if st.button('Run'):
         try:
             ticker_data = scrape_stock_data(ticker)
             stock_data_list.append(ticker_data)
+            stock_data_by_ticker[ticker] = ticker_data
         except Exception as e:
             st.error(f"Error fetching data for {ticker}: {e}")
 
@@ -176,164 +349,15 @@ if st.button('Run'):
     st.table(stock_data_transposed)
 
     # Creating Charts
-    num_subplots = len(tickers) + 1
-    figsize_width =  28
-    figsize_height = num_subplots * 4  # Height of the entire figure
-
-    # Create a figure with subplots: X columns (Ticker, Market Cap, Revenue, Financial Metrics...) for each ticker
-    fig, axs = plt.subplots(num_subplots, 5, figsize=(figsize_width, figsize_height), gridspec_kw={'wspace': 0.5})
-
-    # Adding labels in the first row
-    labels = ["Ticker", "Market Cap", "Financial Metrics", "Revenue Comparison", "52-Week Range"]
-    for j in range(5):
-        axs[0, j].axis('off')
-        axs[0, j].text(0.5, 0.5, labels[j], ha='center', va='center', fontsize=25, fontweight='bold')
-
-    
-    for i, ticker in enumerate(tickers, start=1):
-
-        # Function to scrape market cap data
-        def scrape_market_cap(ticker):
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            market_cap = info.get("marketCap")
-            return market_cap
-    
-        # Get market cap data
-        market_caps = {ticker: scrape_market_cap(ticker) for ticker in tickers}
-        
-        # Find the largest market cap for scaling
-        max_market_cap = max(market_caps.values())
-        
-        #Scrape data for the ticker
-        stock_data = scrape_stock_data(ticker)
-        
-        # Extract Profit Margin, ROA, and ROE values and convert to percentage
-        profit_margin = stock_data["Profit Margin"] * 100
-        roa = stock_data["ROA"] * 100 if isinstance(stock_data["ROA"], (float, int)) and stock_data["ROA"] > 0 else 0
-        roe = stock_data["ROE"] * 100 if isinstance(stock_data["ROE"], (float, int)) and stock_data["ROE"] > 0 else 0
-
-
-        # Ticker Labels (First Column)
-        axs[i, 0].axis('off')
-        axs[i, 0].text(0.5, 0.5, ticker, ha='center', va='center', fontsize=30)
-
-        # Market Cap Visualization (Second Column)
-        ax1 = axs[i, 1]
-        market_cap = market_caps.get(ticker, 0)
-        relative_size = market_cap / max_market_cap if max_market_cap > 0 else 0
-        circle = plt.Circle((0.5, 0.5), relative_size * 0.5, color='lightblue')
-        ax1.add_artist(circle)
-        ax1.set_aspect('equal', adjustable='box')
-        text = ax1.text(0.5, 0.5, f"{market_cap / 1e9:.2f}B", ha='center', va='center', fontsize=20)
-        text.set_path_effects([path_effects.Stroke(linewidth=2, foreground='black'), path_effects.Normal()])
-        ax1.set_xlim(0, 1)
-        ax1.set_ylim(0, 1)
-        ax1.axis('off')
-        
-        # Adjust bar width for less padding
-        bar_width = 1
-        
-        # ROE ROA and PM      
-        # Financial Metrics (Third Column)
-        ax2 = axs[i, 2]
-        metrics = [profit_margin, roa, roe]
-        metric_names = ["Profit Margin", "ROA", "ROE"]
-        bars = ax2.barh(metric_names, metrics, color=['#A3C5A8', '#B8D4B0', '#C8DFBB'])
-        
-        for index, (label, value) in enumerate(zip(metric_names, metrics)):
-            # Adjusting the position dynamically
-            label_x_offset = max(-1, -0.1 * len(str(value)))
-            ax2.text(label_x_offset, index, label, va='center', ha='right', fontsize=16)
-
-        
-            # Add bar label (metric name) to the left of the bar
-            #ax2.text(-1, index, label, va='center', ha='right', fontsize=16)
-
-            # Add value label
-            value_x_position = value + 1 if value >= 0 else value - 1
-            ax2.text(value_x_position, index, f"{value:.2f}%", va='center', ha='left' if value >= 0 else 'right', fontsize=16)
-        
-        ax2.spines['top'].set_visible(False)
-        ax2.spines['right'].set_visible(False)
-        ax2.spines['bottom'].set_visible(False)
-        ax2.spines['left'].set_visible(False)
-        ax2.set_xticks([])
-        ax2.set_yticks([])
-
-
-
-
-        # Revenue Comparison (Third Column)
-        ax3 = axs[i, 3]
-        financials = get_financials(ticker)
-        current_year_revenue = financials.loc["Total Revenue"][0]
-        previous_year_revenue = financials.loc["Total Revenue"][1]
-    
-        current_year_revenue_billion = current_year_revenue / 1e9
-        previous_year_revenue_billion = previous_year_revenue / 1e9
-        growth = ((current_year_revenue_billion - previous_year_revenue_billion) / previous_year_revenue_billion) * 100
-    
-        line_color = 'green' if growth > 0 else 'red'
-    
-        bars = ax3.bar(["2022", "2023"], [previous_year_revenue_billion, current_year_revenue_billion], color=['blue', 'orange'])
-        #ax3.set_title(f"{ticker} Revenue Comparison (2022 vs 2023)")
-    
-        # Adjust Y-axis limits to leave space above the bars
-        ax3.set_ylim(0, max(previous_year_revenue_billion, current_year_revenue_billion) * 1.2)
-    
-        # Adding value labels inside of the bars at the top in white
-        for bar in bars:
-            yval = bar.get_height()
-            ax3.text(bar.get_x() + bar.get_width()/2, yval * .95, round(yval, 2), ha='center', va='top', fontsize=18, fontweight='bold', color='white')
-    
-        # Adding year labels inside of the bars toward the bottom
-        # The 'i' in the for loop below should be changed to avoid conflicts
-        for bar_idx, bar in enumerate(bars):
-            ax3.text(bar.get_x() + bar.get_width()/2, -0.08, ["2022", "2023"][bar_idx], ha='center', va='bottom', fontsize=18, fontweight='bold', color='white')
-    
-        # Adding growth line with color based on direction
-        ax3.plot(["2022", "2023"], [previous_year_revenue_billion, current_year_revenue_billion], color=line_color, marker='o', linestyle='-', linewidth=2)
-        ax3.text(1, current_year_revenue_billion * 1.05, f"{round(growth, 2)}%", color=line_color, ha='center', va='bottom', fontsize=16)
-    
-        # Remove axes lines
-        ax3.spines['top'].set_visible(False)
-        ax3.spines['right'].set_visible(False)
-        ax3.spines['bottom'].set_visible(False)
-        ax3.spines['left'].set_visible(False)
-    
-        # Remove x and y ticks
-        ax3.set_xticks([])
-        ax3.set_yticks([])
-
-        # 52-Week Range (Fourth Column)
-        ax4 = axs[i, 4]
-        stock_data = scrape_stock_data(ticker)
-        current_price = stock_data["Current Price"]
-        week_low = stock_data["52W Low"]
-        week_high = stock_data["52W High"]
-    
-        # Calculate padding for visual clarity
-        padding = (week_high - week_low) * 0.05
-        ax4.set_xlim(week_low - padding, week_high + padding)
-    
-        # Draw a horizontal line for the 52-week range
-        ax4.axhline(y=0.5, xmin=0, xmax=1, color='black', linewidth=3)
-    
-        # Plot the Current Price as a red dot
-        ax4.scatter(current_price, 0.5, color='red', s=200)
-    
-        # Annotations and labels
-        ax4.annotate(f'${current_price:.2f}', xy=(current_price, 0.5), fontsize=16, color='red', ha='center', va='bottom', xytext=(0, 10), textcoords='offset points')
-        ax4.annotate(f'${week_low:.2f}', xy=(week_low, 0.5), fontsize=16, color='black', ha='left', va='top', xytext=(5, -20), textcoords='offset points')
-        ax4.annotate(f'${week_high:.2f}', xy=(week_high, 0.5), fontsize=16, color='black', ha='right', va='top', xytext=(-5, -20), textcoords='offset points')
-    
-        # Remove axes
-        ax4.axis('off')
+    snapshots = [build_row_snapshot(ticker, stock_data_by_ticker[ticker]) for ticker in tickers if ticker in stock_data_by_ticker]
 
+    # Find the largest market cap for scaling
+    max_market_cap = max(snapshot["Market Cap"] for snapshot in snapshots)
 
-    plt.tight_layout()
-    st.pyplot(fig, use_container_width=True)
+    # Each row is rendered to its own image tile; unchanged rows come from the cache
+    st.image(render_header_row(), use_container_width=True)
+    for snapshot in snapshots:
+        st.image(render_ticker_row(snapshot, max_market_cap), use_container_width=True)
 
     
     #if st.button('Run Portfolio Optimizations'):